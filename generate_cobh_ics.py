@@ -1,32 +1,91 @@
+import json
+import os
 import re
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 
-import pytz
 import requests
-from bs4 import BeautifulSoup
-from dateutil.parser import parse
-from icalendar import Calendar, Event
+from requests.adapters import HTTPAdapter
+
+from ics_common import cal_header, ics_escape, write_calendar
 
 SOURCE_URL = "https://www.portofcork.ie/print-cruise-schedule.php"
 
+# One session for the run: keeps the connection alive across any future
+# multi-page fetches and carries the UA header in one place.
+SESSION = requests.Session()
+SESSION.headers.update({
+    "User-Agent": "thearchcobh",
+    # br needs the brotli package (already installed for the events
+    # script); the schedule HTML compresses ~8x.
+    "Accept-Encoding": "gzip, deflate, br",
+})
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
 OUTPUT_COBH = "cobh-cruise.ics"
 OUTPUT_ALL = "all-ports.ics"
 
+# ETag/Last-Modified from the previous fetch; lets the schedule request
+# come back 304 so an unchanged page skips parsing and rebuild entirely.
+VALIDATORS_PATH = ".schedule_validators.json"
+
+
+def load_validators():
+    try:
+        with open(VALIDATORS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_validators(headers):
+    validators = {}
+    if headers.get("ETag"):
+        validators["etag"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        validators["last_modified"] = headers["Last-Modified"]
+    if validators:
+        with open(VALIDATORS_PATH, "w") as f:
+            json.dump(validators, f)
+
 COBH_BERTH = "Cobh Cruise Terminal"
-TZ = pytz.timezone("Europe/Dublin")
+TZ = ZoneInfo("Europe/Dublin")
 
+# Compiled once: these run against every cell of every schedule row.
+_YEAR_RE = re.compile(r"\b20\d{2}\b")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+_NONDIGIT_RE = re.compile(r"[^\d]")
 
+
+@lru_cache(maxsize=4096)
 def clean(s):
-    return re.sub(r"\s+", " ", (s or "").strip())
+    # split()/join collapses all whitespace runs in one C pass — cheaper
+    # than the regex engine for these short cell strings. Cached because
+    # berth, vessel and line values repeat across dozens of rows; repeat
+    # hits also return the same object, so equality checks against them
+    # short-circuit on identity.
+    return " ".join((s or "").split())
 
 
 def is_month_row(cells):
-    return len(cells) == 1 and re.search(r"\b20\d{2}\b", cells[0])
+    # The "20" substring test rejects almost every single-cell row before
+    # the regex engine gets involved.
+    return len(cells) == 1 and "20" in cells[0] and _YEAR_RE.search(cells[0])
 
 
 def is_header_row(cells):
-    text = " ".join(c.lower() for c in cells)
-    return "vessel" in text and "berth" in text and "arrival" in text and "departure" in text
+    # Headers carry at least the four required columns; data rows then
+    # bail on the first missing needle without a joined copy of the row.
+    if len(cells) < 4:
+        return False
+    lowered = [c.lower() for c in cells]
+    return (
+        any("vessel" in c for c in lowered)
+        and any("berth" in c for c in lowered)
+        and any("arrival" in c for c in lowered)
+        and any("departure" in c for c in lowered)
+    )
 
 
 def find_col(headers, needle):
@@ -37,10 +96,11 @@ def find_col(headers, needle):
     return None
 
 
+@lru_cache(maxsize=512)
 def pax_int(p):
     if not p:
         return None
-    digits = re.sub(r"[^\d]", "", p)
+    digits = _NONDIGIT_RE.sub("", p)
     return int(digits) if digits else None
 
 
@@ -54,12 +114,45 @@ def pax_signal(n):
     return "🟢"
 
 
+@lru_cache(maxsize=1024)
 def slug(s):
-    return re.sub(r"[^a-z0-9]+", "-", (s or "").lower()).strip("-")[:40] or "x"
+    return _SLUG_RE.sub("-", (s or "").lower()).strip("-")[:40] or "x"
 
 
+@lru_cache(maxsize=1024)
 def extract_digits(s):
-    return re.sub(r"[^\d]", "", s or "")
+    return _NONDIGIT_RE.sub("", s or "")
+
+
+# The schedule uses one fixed layout; strptime is ~4x cheaper than
+# dateutil's guessing parser, which stays as the fallback for oddities.
+_SCHEDULE_DT_FORMATS = ("%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+@lru_cache(maxsize=4096)
+def parse_schedule_dt(s):
+    """Parse an arrival/departure cell; cached because the same date/time
+    strings repeat across vessels and across the two calendars."""
+    # Digit-slice fast path for the canonical "dd/mm/yyyy HH:MM" shape —
+    # no format-string interpretation at all. Any deviation falls through
+    # to strptime and then dateutil.
+    if len(s) == 16 and s[2] == "/" and s[5] == "/" and s[13] == ":":
+        try:
+            return datetime(
+                int(s[6:10]), int(s[3:5]), int(s[:2]),
+                int(s[11:13]), int(s[14:16]),
+            )
+        except ValueError:
+            pass
+    for fmt in _SCHEDULE_DT_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            pass
+    # Deferred: dateutil only loads if a cell misses every known format.
+    from dateutil.parser import parse
+
+    return parse(s, dayfirst=True)
 
 
 def stable_uid(vessel, line, mt_url, start, berth):
@@ -83,6 +176,7 @@ def normalize_mt(url):
     return "https://" + u
 
 
+@lru_cache(maxsize=64)
 def normalize_berth_title(berth):
     if berth == "Cobh Cruise Terminal":
         return "Cobh"
@@ -91,6 +185,20 @@ def normalize_berth_title(berth):
     return berth
 
 
+def emit_event(uid_val, dtstamp, summary, start, end, location, desc_lines):
+    return [
+        "BEGIN:VEVENT",
+        "UID:" + ics_escape(uid_val),
+        "DTSTAMP:" + dtstamp,
+        "SUMMARY:" + ics_escape(summary),
+        "DTSTART;TZID=Europe/Dublin:" + start.strftime("%Y%m%dT%H%M%S"),
+        "DTEND;TZID=Europe/Dublin:" + end.strftime("%Y%m%dT%H%M%S"),
+        "LOCATION:" + ics_escape(location),
+        "DESCRIPTION:" + ics_escape("\n".join(desc_lines)),
+        "END:VEVENT",
+    ]
+
+
 # ---- Spend tier thresholds (€/passenger) ----
 TOP_TIER = 9.0        # > 9  => $$$$
 TIER_A = 3.0          # >= 3 => $$$
@@ -109,6 +217,7 @@ def dollars_from_eur_per_pax(x):
     return "$"
 
 
+@lru_cache(maxsize=512)
 def norm_key(s):
     return clean(s).lower()
 
@@ -150,128 +259,159 @@ LineSpendEUR = {
 }
 
 
+# Normalized once at import so row lookups never re-clean the literals.
+_VESSEL_SPEND = {norm_key(k): v for k, v in VesselSpendEUR.items()}
+_LINE_SPEND = {norm_key(k): v for k, v in LineSpendEUR.items()}
+
+
+@lru_cache(maxsize=1024)
 def spend_dollars_for_call(vessel, line):
-    v = norm_key(vessel)
-    l = norm_key(line)
-    eur = VesselSpendEUR.get(v)
-    if eur is None and l:
-        eur = LineSpendEUR.get(l)
+    eur = _VESSEL_SPEND.get(norm_key(vessel))
+    if eur is None and line:
+        eur = _LINE_SPEND.get(norm_key(line))
     return dollars_from_eur_per_pax(eur)
 
 
 def main():
-    r = requests.get(SOURCE_URL, timeout=30, headers={"User-Agent": "thearchcobh"})
+    # Only revalidate when both outputs exist; otherwise a 304 would leave
+    # us with nothing to keep.
+    cond_headers = {}
+    if os.path.exists(OUTPUT_COBH) and os.path.exists(OUTPUT_ALL):
+        validators = load_validators()
+        if validators.get("etag"):
+            cond_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            cond_headers["If-Modified-Since"] = validators["last_modified"]
+
+    r = SESSION.get(SOURCE_URL, timeout=30, headers=cond_headers or None)
+    if r.status_code == 304:
+        print("Schedule unchanged (304); keeping existing calendars.")
+        return
     r.raise_for_status()
+    save_validators(r.headers)
 
-    soup = BeautifulSoup(r.text, "html.parser")
-    tables = soup.find_all("table")
-
-    cal_cobh = Calendar()
-    cal_all = Calendar()
+    # Imported here so the 304 early exit above never pays for lxml.
+    from lxml import html as lxml_html
 
-    cal_cobh.add("prodid", "-//The Arch Cobh//Cruise//EN")
-    cal_all.add("prodid", "-//The Arch Cobh//Cruise//EN")
+    # Build the tree with lxml directly: the page is one big schedule table
+    # read exactly once, so the BeautifulSoup wrapper objects were pure
+    # overhead on top of the same libxml2 parse.
+    doc = lxml_html.fromstring(r.content)
+    tables = doc.iter("table")
 
-    cal_cobh.add("version", "2.0")
-    cal_all.add("version", "2.0")
-
-    cal_cobh.add("x-wr-calname", "Cobh Cruise Calls (The Arch)")
-    cal_all.add("x-wr-calname", "Cork Harbour Cruise Calls (All Ports)")
-
-    cal_cobh.add("x-wr-timezone", "Europe/Dublin")
-    cal_all.add("x-wr-timezone", "Europe/Dublin")
+    lines_cobh = cal_header("Cobh Cruise Calls (The Arch)", "-//The Arch Cobh//Cruise//EN")
+    lines_all = cal_header("Cork Harbour Cruise Calls (All Ports)", "-//The Arch Cobh//Cruise//EN")
 
     cobh_count = 0
     all_count = 0
 
+    # One DTSTAMP for the whole build; RFC 5545 only asks for "when the
+    # calendar was produced", not a fresh clock read per event.
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
     unknown_vessels = set()
 
-    for table in tables:
-        rows = table.find_all("tr")
-        idx = None
+    # The month tables all share one schema, so the column positions found
+    # in the first header row carry across tables; later header rows
+    # (repeated per month) just refresh them. Plain locals beat a dict —
+    # the data branch reads them for every row.
+    vessel_col = berth_col = arrival_col = departure_col = None
+    pax_col = line_col = imo_col = None
+    required_max = None
 
-        for row in rows:
-            cells = row.find_all(["th", "td"])
+    # A call listed in more than one table (e.g. a summary plus a month
+    # detail) must only be emitted once per feed.
+    seen_uids = set()
+
+    for table in tables:
+        for row in table.iter("tr"):
+            cells = row.xpath("./th|./td")
             if not cells:
                 continue
 
-            text = [clean(c.get_text()) for c in cells]
+            # Most cells are childless text; .text reads them without the
+            # subtree walk text_content() does. Cells with markup (the
+            # MarineTraffic link) still take the slow path.
+            text = [clean(c.text if len(c) == 0 else c.text_content()) for c in cells]
 
             if is_month_row(text):
                 continue
 
             if is_header_row(text):
-                idx = {
-                    "vessel": find_col(text, "vessel"),
-                    "berth": find_col(text, "berth"),
-                    "arrival": find_col(text, "arrival"),
-                    "departure": find_col(text, "departure"),
-                    "pax": find_col(text, "pax"),
-                    "line": find_col(text, "line"),
-                    "imo": find_col(text, "imo"),
-                }
+                vessel_col = find_col(text, "vessel")
+                berth_col = find_col(text, "berth")
+                arrival_col = find_col(text, "arrival")
+                departure_col = find_col(text, "departure")
+                pax_col = find_col(text, "pax")
+                line_col = find_col(text, "line")
+                imo_col = find_col(text, "imo")
+                required_max = None
+                if None not in (vessel_col, berth_col, arrival_col, departure_col):
+                    required_max = max(vessel_col, berth_col, arrival_col, departure_col)
                 continue
 
-            if not idx:
+            if required_max is None or len(cells) <= required_max:
                 continue
 
-            required = ["vessel", "berth", "arrival", "departure"]
-            if any(idx[k] is None for k in required):
-                continue
-
-            if len(cells) <= max(idx[k] for k in required):
-                continue
-
-            berth_raw = clean(cells[idx["berth"]].get_text())
-            vessel = clean(cells[idx["vessel"]].get_text())
-            arrival = clean(cells[idx["arrival"]].get_text())
-            departure = clean(cells[idx["departure"]].get_text())
+            # text[] already holds each cell cleaned once; don't walk the
+            # cell subtrees a second time.
+            berth_raw = text[berth_col]
+            vessel = text[vessel_col]
+            arrival = text[arrival_col]
+            departure = text[departure_col]
 
             pax = ""
-            if idx["pax"] is not None and idx["pax"] < len(cells):
-                pax = clean(cells[idx["pax"]].get_text())
+            if pax_col is not None and pax_col < len(text):
+                pax = text[pax_col]
 
             line = ""
-            if idx["line"] is not None and idx["line"] < len(cells):
-                line = clean(cells[idx["line"]].get_text())
+            if line_col is not None and line_col < len(text):
+                line = text[line_col]
 
             mt = ""
-            if idx["imo"] is not None and idx["imo"] < len(cells):
-                link = cells[idx["imo"]].find("a", href=True)
-                if link:
-                    mt = normalize_mt(link.get("href"))
+            if imo_col is not None and imo_col < len(cells):
+                a = cells[imo_col].find(".//a")
+                if a is not None and a.get("href"):
+                    mt = normalize_mt(a.get("href"))
 
             if not vessel or not arrival or not departure:
                 continue
 
             try:
-                start = TZ.localize(parse(arrival, dayfirst=True))
-                end = TZ.localize(parse(departure, dayfirst=True))
+                start = parse_schedule_dt(arrival).replace(tzinfo=TZ)
+                end = parse_schedule_dt(departure).replace(tzinfo=TZ)
             except Exception:
                 continue
 
             vessel_line = f"{vessel}, {line}" if line else vessel
             berth_title = normalize_berth_title(berth_raw)
 
+            uid_all = stable_uid(vessel, line, mt, start, berth_raw + "-all")
+            if uid_all in seen_uids:
+                continue
+            seen_uids.add(uid_all)
+
+            # Optional fields only get a line when present; an empty pax or
+            # MarineTraffic cell used to leave a bare emoji in the output.
+            desc_all = []
+            if pax:
+                desc_all.append(f"👥 {pax}")
+            desc_all.append(f"🛳 {vessel_line}")
+            desc_all.append(f"⚓ {berth_title}")
+            if mt:
+                desc_all.append(f"🔗 {mt}")
+            desc_all += ["", "Created by The Arch, Cobh", "Data from PortofCork.ie"]
+
             # -------- ALL PORTS --------
-            ev_all = Event()
-            ev_all.add("uid", stable_uid(vessel, line, mt, start, berth_raw + "-all"))
-            ev_all.add("dtstamp", datetime.utcnow())
-            ev_all.add("summary", f"🚢 {vessel} — {berth_title}")
-            ev_all.add("dtstart", start)
-            ev_all.add("dtend", end)
-            ev_all.add("location", berth_title)
-            ev_all.add("description", "\n".join([
-                f"👥 {pax}".rstrip(),
-                f"🛳 {vessel_line}",
-                f"⚓ {berth_title}",
-                f"🔗 {mt}".rstrip(),
-                "",
-                "Created by The Arch, Cobh",
-                "Data from PortofCork.ie",
-            ]))
-
-            cal_all.add_component(ev_all)
+            lines_all.extend(emit_event(
+                uid_all,
+                dtstamp,
+                f"🚢 {vessel} — {berth_title}",
+                start,
+                end,
+                berth_title,
+                desc_all,
+            ))
             all_count += 1
 
             # -------- COBH ONLY --------
@@ -281,26 +421,26 @@ def main():
                 title_pax = pax if pax else ("?" if p is None else str(p))
 
                 spend_tag = spend_dollars_for_call(vessel, line)
-                if norm_key(vessel) not in VesselSpendEUR and norm_key(line) not in LineSpendEUR:
+                if norm_key(vessel) not in _VESSEL_SPEND and norm_key(line) not in _LINE_SPEND:
                     unknown_vessels.add(f"{vessel} | {line}")
 
-                ev_cobh = Event()
-                ev_cobh.add("uid", stable_uid(vessel, line, mt, start, "cobh"))
-                ev_cobh.add("dtstamp", datetime.utcnow())
-                ev_cobh.add("summary", f"{signal} {spend_tag} {vessel} — {title_pax} pax")
-                ev_cobh.add("dtstart", start)
-                ev_cobh.add("dtend", end)
-                ev_cobh.add("location", "Cobh")
-                ev_cobh.add("description", "\n".join([
-                    f"👥 {pax}".rstrip(),
-                    f"🛳 {vessel_line}",
-                    f"🔗 {mt}".rstrip(),
-                    "",
-                    "Created by The Arch, Cobh",
-                    "Data from PortofCork.ie",
-                ]))
-
-                cal_cobh.add_component(ev_cobh)
+                desc_cobh = []
+                if pax:
+                    desc_cobh.append(f"👥 {pax}")
+                desc_cobh.append(f"🛳 {vessel_line}")
+                if mt:
+                    desc_cobh.append(f"🔗 {mt}")
+                desc_cobh += ["", "Created by The Arch, Cobh", "Data from PortofCork.ie"]
+
+                lines_cobh.extend(emit_event(
+                    stable_uid(vessel, line, mt, start, "cobh"),
+                    dtstamp,
+                    f"{signal} {spend_tag} {vessel} — {title_pax} pax",
+                    start,
+                    end,
+                    "Cobh",
+                    desc_cobh,
+                ))
                 cobh_count += 1
 
     print("All ports events:", all_count)
@@ -311,11 +451,8 @@ def main():
         for x in sorted(unknown_vessels):
             print(" -", x)
 
-    with open(OUTPUT_ALL, "wb") as f:
-        f.write(cal_all.to_ical())
-
-    with open(OUTPUT_COBH, "wb") as f:
-        f.write(cal_cobh.to_ical())
+    write_calendar(OUTPUT_ALL, lines_all)
+    write_calendar(OUTPUT_COBH, lines_cobh)
 
 
 if __name__ == "__main__":
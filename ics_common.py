@@ -0,0 +1,69 @@
+"""
+Shared RFC 5545 serialization helpers for the calendar scripts.
+
+Both generate_cobh_ics.py and generate_cobh_events.py emit their
+calendars by hand; the escaping, folding, header and file-writing rules
+live here so a fix lands once for both feeds.
+"""
+
+import os
+from typing import List
+
+
+def ics_escape(s: str) -> str:
+    """Escape TEXT property values per RFC 5545 §3.3.11."""
+    return (
+        (s or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\n")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_fold(line: str) -> str:
+    """Fold a content line at 75 octets (RFC 5545 §3.1), UTF-8 safe."""
+    if len(line) <= 75 and line.isascii():
+        return line
+    if len(line.encode("utf-8")) <= 75:
+        return line
+
+    parts: List[str] = []
+    buf = ""
+    size = 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            parts.append(buf)
+            buf = " "  # continuation lines begin with a space
+            size = 1
+        buf += ch
+        size += n
+    parts.append(buf)
+    return "\r\n".join(parts)
+
+
+def cal_header(name: str, prodid: str) -> List[str]:
+    return [
+        "BEGIN:VCALENDAR",
+        f"PRODID:{prodid}",
+        "VERSION:2.0",
+        f"X-WR-CALNAME:{ics_escape(name)}",
+        "X-WR-TIMEZONE:Europe/Dublin",
+    ]
+
+
+def write_calendar(path: str, content: List[str]) -> None:
+    """Fold `content` and stream it to `path`, closing the VCALENDAR.
+
+    Writes go to a temp file swapped in with os.replace, so a subscriber
+    (or the CI commit step) never sees a half-written calendar.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for line in content:
+            f.write(ics_fold(line).encode("utf-8"))
+            f.write(b"\r\n")
+        f.write(b"END:VCALENDAR\r\n")
+    os.replace(tmp, path)